@@ -11,7 +11,20 @@ __author__ = "Michael J. Harms"
 __date__ = "2016-05-20"
 
 import serial
-import re, warnings, multiprocessing, time, struct
+import re, warnings, threading, collections, time, struct, functools
+
+# Minimum number of same-format numeric arguments to pack/unpack in bulk.
+# Escaping each field costs the same either way, so for shorter runs the
+# single value methods are as fast as one struct call.
+ARRAY_MIN_LENGTH = 32
+
+@functools.lru_cache(maxsize=128)
+def _repeated_struct(base_format,count):
+    """
+    Return a struct.Struct that packs count values of base_format (e.g. "<f").
+    """
+
+    return struct.Struct(base_format[0] + base_format[1:]*count)
 
 class CmdMessenger:
     """
@@ -72,6 +85,20 @@ class CmdMessenger:
         self.escape_separator = escape_separator
         self.give_warnings = warnings
 
+        # Serialize access to the serial port.  The listener thread (see
+        # listen) reads from the port in the background.
+        self._lock = threading.RLock()
+        self._receive_lock = threading.RLock()
+
+        self._listener_thread = None
+        self._listener_stop = threading.Event()
+        self._received_messages = collections.deque()
+        self._send_buffer = bytearray()
+
+        # Start of a message whose read timed out before its command separator
+        # arrived.  The next receive continues from here.
+        self._partial_msg = bytearray()
+
         self._cmd_name_to_int = {}
         self._int_to_cmd_name = {}
         self._cmd_name_to_format = {}
@@ -83,15 +110,49 @@ class CmdMessenger:
         self._byte_field_sep = self.field_separator.encode("ascii")
         self._byte_command_sep = self.command_separator.encode("ascii")
         self._byte_escape_sep = self.escape_separator.encode("ascii")
-        self._escaped_characters = [self._byte_field_sep,
-                                    self._byte_command_sep,
-                                    self._byte_escape_sep,
-                                    b'\0']
-
-        self._null_escape_re = re.compile(b'\0')
-        self._escape_re = re.compile("([{}{}{}\0])".format(self.field_separator,
-                                                           self.command_separator,
-                                                           self.escape_separator).encode('ascii'))
+        self._escaped_characters = frozenset([self._byte_field_sep,
+                                              self._byte_command_sep,
+                                              self._byte_escape_sep,
+                                              b'\0'])
+
+        # (character, escaped character) pairs used to escape outgoing fields.
+        # The escape character must come first so the escapes added for the
+        # other characters are not themselves escaped. 
+        self._escape_pairs = tuple([(c,self._byte_escape_sep + c)
+                                    for c in [self._byte_escape_sep,
+                                              self._byte_field_sep,
+                                              self._byte_command_sep,
+                                              b'\0']])
+
+        # Regular expressions used to parse incoming messages.  _field_re
+        # matches a single field (escaped pairs or anything that is not a
+        # field separator or escape character); _unescape_re drops the escape
+        # character in front of any escaped control character. 
+        esc = re.escape(self._byte_escape_sep)
+        self._field_re = re.compile(b"(?:" + esc + b".|[^" + esc +
+                                    re.escape(self._byte_field_sep) + b"])*",
+                                    re.DOTALL)
+        self._unescape_re = re.compile(esc + b"([" +
+                                       b"".join([re.escape(c) for c in self._escaped_characters]) +
+                                       b"])")
+
+        # Compile struct formats once rather than on every pack/unpack call
+        self._byte_struct = struct.Struct("B")
+        self._int_struct = struct.Struct(self.board.int_type)
+        self._unsigned_int_struct = struct.Struct(self.board.unsigned_int_type)
+        self._long_struct = struct.Struct(self.board.long_type)
+        self._unsigned_long_struct = struct.Struct(self.board.unsigned_long_type)
+        self._float_struct = struct.Struct(self.board.float_type)
+        self._double_struct = struct.Struct(self.board.double_type)
+
+        # struct formats for the numeric types that can be packed in bulk
+        self._array_formats = {"b":"<B",
+                               "i":self.board.int_type,
+                               "I":self.board.unsigned_int_type,
+                               "l":self.board.long_type,
+                               "L":self.board.unsigned_long_type,
+                               "f":self.board.float_type,
+                               "d":self.board.double_type}
 
         self._send_methods = {"c":self._send_char,
                               "b":self._send_byte,
@@ -117,7 +178,28 @@ class CmdMessenger:
                               "?":self._recv_bool,
                               "g":self._recv_guess}
 
-    def send(self,cmd,*args,arg_formats=None):
+        # Look up the conversion methods for each command's argument formats
+        # once, here, rather than on every send/receive.  Formats containing
+        # "*" depend on the number of arguments and are resolved per call.
+        self._cmd_name_to_send_funcs = {}
+        self._cmd_name_to_recv_funcs = {}
+        self._cmd_name_to_array_format = {}
+        for cmd_name, arg_formats in self._cmd_name_to_format.items():
+            if "*" in arg_formats:
+                continue
+            try:
+                self._cmd_name_to_send_funcs[cmd_name] = tuple([self._send_methods[f] for f in arg_formats])
+                self._cmd_name_to_recv_funcs[cmd_name] = tuple([self._recv_methods[f] for f in arg_formats])
+                self._cmd_name_to_array_format[cmd_name] = self._get_array_format(arg_formats)
+            except KeyError:
+                pass
+
+        # Complete messages for commands sent without arguments (cmd;)
+        self._cmd_name_to_noarg_bytes = {}
+        for cmd_name, i in self._cmd_name_to_int.items():
+            self._cmd_name_to_noarg_bytes[cmd_name] = b"%d" % i + self._byte_command_sep
+
+    def send(self,cmd,*args,arg_formats=None,flush=True):
         """
         Send a command (which may or may not have associated arguments) to an 
         arduino using the CmdMessage protocol.  The command and any parameters
@@ -126,7 +208,74 @@ class CmdMessenger:
         arg_formats is an optional string that specifies the formats to use for
         each argument when passed to the arduino. If specified here,
         arg_formats supercedes formats specified on initialization.  
+
+        flush is an optional keyword.  If False, the message is held in an 
+        outgoing buffer rather than written immediately; buffered messages are
+        written (in a single write) by the next call to flush or by the next
+        send with flush=True.
+        """
+
+        # Commands without arguments have precomputed bytes that can be
+        # written as is when nothing is waiting in the outgoing buffer.
+        if len(args) == 0 and flush and cmd in self._cmd_name_to_noarg_bytes:
+            with self._lock:
+                if len(self._send_buffer) == 0:
+                    self.board.write(self._cmd_name_to_noarg_bytes[cmd])
+                    return
+
+        compiled_bytes = bytearray()
+        self._compile_message(cmd,args,arg_formats,compiled_bytes)
+
+        with self._lock:
+            self._send_buffer += compiled_bytes
+            if flush:
+                self._flush()
+
+    def send_many(self,cmds):
         """
+        Send several commands to the arduino with a single serial write.  cmds
+        is a list of tuples, each holding a command name followed by its 
+        arguments (e.g. [("sum_two_ints",4,1),("who_are_you",)]).  Arguments
+        are formatted using the formats specified on initialization.  
+        """
+
+        compiled_bytes = bytearray()
+        for c in cmds:
+            self._compile_message(c[0],c[1:],None,compiled_bytes)
+
+        with self._lock:
+            self._send_buffer += compiled_bytes
+            self._flush()
+
+    def flush(self):
+        """
+        Write any messages held in the outgoing buffer (see send) to the 
+        arduino.
+        """
+
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        """
+        Write the outgoing buffer to the serial port and clear it.  The caller
+        must hold self._lock.
+        """
+
+        if len(self._send_buffer) > 0:
+            self.board.write(self._send_buffer)
+            self._send_buffer.clear()
+
+    def _compile_message(self,cmd,args,arg_formats,buf):
+        """
+        Append the bytes for a command and its arguments, ready to write to
+        the serial port (e.g. cmd,field1,field2,field3;), to the bytearray buf.
+        """
+
+        # Commands without arguments have precomputed bytes
+        if len(args) == 0 and cmd in self._cmd_name_to_noarg_bytes:
+            buf += self._cmd_name_to_noarg_bytes[cmd]
+            return
 
         # Turn the command into an integer.
         try:
@@ -135,42 +284,59 @@ class CmdMessenger:
             err = "Command '{}' not recognized.\n".format(cmd)
             raise ValueError(err)
 
-        # Figure out what formats to use for each argument.  
-        arg_format_list = []
-        if arg_formats != None:
+        # Figure out what conversion method to use for each argument.  
+        array_format = None
+        if arg_formats == None and cmd in self._cmd_name_to_send_funcs:
 
-            # The user specified formats
-            arg_format_list = list(arg_formats)
+            # Use the methods worked out on initialization
+            send_funcs = self._cmd_name_to_send_funcs[cmd]
+            array_format = self._cmd_name_to_array_format[cmd]
 
         else:
-            try:
-                # See if class was initialized with a format for arguments to this
-                # command
-                arg_format_list = self._cmd_name_to_format[cmd]
-            except KeyError:
-                # if not, guess for all arguments
-                arg_format_list = ["g" for i in range(len(args))]
-  
-        # Deal with "*" format  
-        arg_format_list = self._treat_star_format(arg_format_list,args)
+
+            arg_format_list = []
+            if arg_formats != None:
+
+                # The user specified formats
+                arg_format_list = list(arg_formats)
+
+            else:
+                try:
+                    # See if class was initialized with a format for arguments to this
+                    # command
+                    arg_format_list = self._cmd_name_to_format[cmd]
+                except KeyError:
+                    # if not, guess for all arguments
+                    arg_format_list = ["g" for i in range(len(args))]
+      
+            # Deal with "*" format  
+            arg_format_list = self._treat_star_format(arg_format_list,args)
+
+            send_funcs = [self._send_methods[f] for f in arg_format_list]
+            array_format = self._get_array_format(arg_format_list)
 
         if len(args) > 0:
-            if len(arg_format_list) != len(args):
+            if len(send_funcs) != len(args):
                 err = "Number of argument formats must match the number of arguments."
                 raise ValueError(err)
 
         # Go through each argument and create a bytes representation in the
-        # proper format to send.  Escape appropriate characters. 
-        fields = ["{}".format(command_as_int).encode("ascii")]
-        for i, a in enumerate(args):
-            fields.append(self._send_methods[arg_format_list[i]](a))
-            fields[-1] = self._escape_re.sub(self._byte_escape_sep + r"\1".encode("ascii"),fields[-1])
-
-        # Make something that looks like cmd,field1,field2,field3;
-        compiled_bytes = self._byte_field_sep.join(fields) + self._byte_command_sep
-
-        # Send the message.
-        self.board.write(compiled_bytes)
+        # proper format to send.  This is done before touching buf so a bad
+        # argument does not leave a partial message behind.
+        if array_format != None:
+            values = self._send_array(args,array_format)
+        else:
+            values = [f(a) for f, a in zip(send_funcs,args)]
+
+        # Escape appropriate characters, building something that looks like
+        # cmd,field1,field2,field3; directly in buf.
+        buf += b"%d" % command_as_int
+        for value in values:
+            for c, escaped_c in self._escape_pairs:
+                value = value.replace(c,escaped_c)
+            buf += self._byte_field_sep
+            buf += value
+        buf += self._byte_command_sep
 
     def receive(self,arg_formats=None):
         """
@@ -179,70 +345,77 @@ class CmdMessenger:
         arg_formats is an optimal keyword that specifies the formats to use to
         parse incoming arguments.  If specified here, arg_formats supercedes
         the formats specified on initialization.  
+
+        If the serial read times out part way through a message, None is 
+        returned and the rest of the message is picked up by the next call.
+        The fragment is only kept while bytes keep arriving: if the next call
+        times out without reading anything new, the fragment is dropped and 
+        EOFError is raised.  clear_partial_message drops it immediately.
         """
 
-        # Read serial input until a command separator or empty character is
-        # reached 
-        msg = [[]]
-        raw_msg = []
-        escaped = False
+        # Read serial input until an unescaped command separator is reached or
+        # the serial read times out.
         command_sep_found = False
-        while True:
+        with self._receive_lock:
 
-            tmp = self.board.read()
-            raw_msg.append(tmp)
+            # Pick up any message left incomplete by the last receive
+            raw_msg = self._partial_msg
+            self._partial_msg = bytearray()
+            partial_length = len(raw_msg)
 
-            if escaped:
+            # Bind names used in the read loop locally
+            read_until = self.board.read_until
+            command_sep = self._byte_command_sep
+            escape_sep = self._byte_escape_sep
 
-                # Either drop the escape character or, if this wasn't really
-                # an escape, keep previous escape character and new character
-                if tmp in self._escaped_characters:
-                    msg[-1].append(tmp)
-                    escaped = False
-                else:
-                    msg[-1].append(self._byte_escape_sep)
-                    msg[-1].append(tmp)
-                    escaped = False
-            else:
+            while True:
 
-                # look for escape character
-                if tmp == self._byte_escape_sep:
-                    escaped = True
+                tmp = read_until(command_sep)
+                raw_msg += tmp
 
-                # or field separator
-                elif tmp == self._byte_field_sep:
-                    msg.append([])
+                # Timed out before a command separator arrived
+                if not tmp.endswith(command_sep):
+                    break
+
+                # The separator only ends the message if it is preceded by an
+                # even number of escape characters (i.e. it is not itself
+                # escaped).
+                end = len(raw_msg) - len(command_sep)
+                i = end
+                while i > 0 and raw_msg[i-1:i] == escape_sep:
+                    i -= 1
 
-                # or command separator
-                elif tmp == self._byte_command_sep:
+                if (end - i) % 2 == 0:
+                    del raw_msg[end:]
                     command_sep_found = True
                     break
 
-                # or any empty characater 
-                elif tmp == b'':
-                    break
+            # If the read timed out part way through a message, hold on to
+            # what arrived so the next receive can finish it.  Anything that
+            # is only white space (likely line endings) is dropped, as is a 
+            # fragment that got no new bytes during this read.
+            if not command_sep_found:
 
-                # okay, must be something
-                else:
-                    msg[-1].append(tmp)
-  
-        # No message received given timeouts
-        if len(msg) == 1 and len(msg[0]) == 0:
-            return None
+                # empty message (likely from line endings being included) 
+                if raw_msg.strip() == b'':
+                    return None
+
+                if len(raw_msg) > partial_length:
+                    self._partial_msg = raw_msg
+                    return None
 
-        # Make sure the message terminated properly
-        if not command_sep_found:
-          
-            # empty message (likely from line endings being included) 
-            joined_raw = b''.join(raw_msg) 
-            if joined_raw.strip() == b'':
-                return  None
-           
-            err = "Incomplete message ({})".format(joined_raw.decode())
-            raise EOFError(err)
+                err = "Incomplete message ({})".format(raw_msg.decode())
+                raise EOFError(err)
+
+        raw_msg = bytes(raw_msg)
+
+        # Empty message
+        if len(raw_msg) == 0:
+            return None
 
         # Turn message into fields
-        fields = [b''.join(m) for m in msg]
+        fields = self._split_fields(raw_msg)
+        arg_fields = fields[1:]
 
         # Get the command name.
         cmd = fields[0].strip().decode()
@@ -255,39 +428,186 @@ class CmdMessenger:
                 w = "Recieved unrecognized command ({}).".format(cmd)
                 warnings.warn(w,Warning)
         
-        # Figure out what formats to use for each argument.  
-        arg_format_list = []
-        if arg_formats != None:
+        # Figure out what conversion method to use for each argument.  
+        array_format = None
+        if arg_formats == None and cmd_name in self._cmd_name_to_recv_funcs:
 
-            # The user specified formats
-            arg_format_list = list(arg_formats)
+            # Use the methods worked out on initialization
+            recv_funcs = self._cmd_name_to_recv_funcs[cmd_name]
+            array_format = self._cmd_name_to_array_format[cmd_name]
 
         else:
-            try:
-                # See if class was initialized with a format for arguments to this
-                # command
-                arg_format_list = self._cmd_name_to_format[cmd_name]
-            except KeyError:
-                # if not, guess for all arguments
-                arg_format_list = ["g" for i in range(len(fields[1:]))]
 
-        # Deal with "*" format  
-        arg_format_list = self._treat_star_format(arg_format_list,fields[1:])
+            arg_format_list = []
+            if arg_formats != None:
 
-        if len(fields[1:]) > 0:
-            if len(arg_format_list) != len(fields[1:]):
+                # The user specified formats
+                arg_format_list = list(arg_formats)
+
+            else:
+                try:
+                    # See if class was initialized with a format for arguments to this
+                    # command
+                    arg_format_list = self._cmd_name_to_format[cmd_name]
+                except KeyError:
+                    # if not, guess for all arguments
+                    arg_format_list = ["g" for i in range(len(arg_fields))]
+
+            # Deal with "*" format  
+            arg_format_list = self._treat_star_format(arg_format_list,arg_fields)
+
+            recv_funcs = [self._recv_methods[f] for f in arg_format_list]
+            array_format = self._get_array_format(arg_format_list)
+
+        if len(arg_fields) > 0:
+            if len(recv_funcs) != len(arg_fields):
                 err = "Number of argument formats must match the number of recieved arguments."
                 raise ValueError(err)
 
-        received = []
-        for i, f in enumerate(fields[1:]):
-            received.append(self._recv_methods[arg_format_list[i]](f))
+        if array_format != None:
+            received = self._recv_array(arg_fields,array_format)
+        else:
+            received = []
+            for f, value in zip(recv_funcs,arg_fields):
+                received.append(f(value))
         
         # Record the time the message arrived
         message_time = time.time()
 
         return cmd_name, received, message_time
 
+    def clear_partial_message(self):
+        """
+        Drop any incomplete message held over from a receive that timed out
+        part way through a message.
+        """
+
+        with self._receive_lock:
+            self._partial_msg = bytearray()
+
+    def listen(self):
+        """
+        Start a background thread that continuously receives messages from
+        the serial port and stores them.  Retrieve them with 
+        receive_from_listener.  
+
+        The thread waits on the serial port between messages, so the board's
+        timeout sets how long stop_listening may take to return.  The board
+        must have a positive timeout.
+        """
+
+        if self.listening:
+            return
+
+        # Without a timeout the thread could wait on the port forever and 
+        # stop_listening would never return.
+        timeout = self.board.timeout
+        if timeout == None or timeout <= 0:
+            err = "listen requires a board with a positive serial timeout, not {}".format(timeout)
+            raise ValueError(err)
+
+        self._listener_stop.clear()
+        self._listener_thread = threading.Thread(target=self._listen,daemon=True)
+        self._listener_thread.start()
+
+    def stop_listening(self):
+        """
+        Stop the background listener thread started by listen.
+        """
+
+        if not self.listening:
+            return
+
+        self._listener_stop.set()
+        self._listener_thread.join()
+        self._listener_thread = None
+
+    def receive_from_listener(self):
+        """
+        Return a list of all messages collected by the listener since the last
+        call, in the order they arrived.  Each message has the same form as
+        the output of receive.
+        """
+
+        # popleft is atomic, so messages appended by the listener while this
+        # runs are either returned now or left for the next call.
+        out = []
+        while True:
+            try:
+                out.append(self._received_messages.popleft())
+            except IndexError:
+                break
+
+        return out
+
+    @property
+    def listening(self):
+        """
+        Return listener state.  Listening (True), not listening (False).
+        """
+
+        return self._listener_thread is not None and self._listener_thread.is_alive()
+
+    def _listen(self):
+        """
+        Receive messages until told to stop, putting them on the queue of 
+        received messages.  Runs in the listener thread.  receive blocks until
+        a message arrives or the serial read times out, so no sleep is needed
+        between calls.  A message that cannot be parsed is skipped (with a 
+        warning) rather than stopping the listener.
+        """
+
+        while not self._listener_stop.is_set():
+
+            try:
+                tmp = self.receive()
+            except (EOFError,ValueError,KeyError,IndexError,struct.error) as e:
+                if self.give_warnings:
+                    w = "Listener skipped a message that could not be parsed ({}).".format(e)
+                    warnings.warn(w,Warning)
+                continue
+
+            if tmp is not None:
+                self._received_messages.append(tmp)
+
+    def _split_fields(self,raw_msg):
+        """
+        Split a raw message (without its command separator) into unescaped 
+        fields.
+        """
+
+        # Without any escape characters the message can simply be split
+        if self._byte_escape_sep not in raw_msg:
+            return raw_msg.split(self._byte_field_sep)
+
+        # Bind names used in the loop locally
+        match = self._field_re.match
+        unescape = self._unescape_re.sub
+        field_sep = self._byte_field_sep
+        msg_length = len(raw_msg)
+
+        fields = []
+        position = 0
+        while True:
+
+            # Grab everything up to the next unescaped field separator
+            m = match(raw_msg,position)
+            fields.append(unescape(rb"\1",m.group(0)))
+            position = m.end()
+
+            if position >= msg_length:
+                break
+
+            # Skip over the field separator.  Anything else is a dangling
+            # escape character at the end of the message; keep it.
+            if raw_msg[position:position+1] == field_sep:
+                position += 1
+            else:
+                fields[-1] += raw_msg[position:]
+                break
+
+        return fields
+
     def _treat_star_format(self,arg_format_list,args):
         """
         Deal with "*" format if specified.
@@ -316,27 +636,77 @@ class CmdMessenger:
 
         return arg_format_list 
 
+    def _get_array_format(self,arg_format_list):
+        """
+        Return the format if arg_format_list is a long run of a single numeric
+        format that can be packed/unpacked in bulk.  Otherwise return None.
+        """
+
+        if len(arg_format_list) < ARRAY_MIN_LENGTH:
+            return None
+
+        f = arg_format_list[0]
+        if f not in self._array_formats:
+            return None
+
+        if len(set(arg_format_list)) != 1:
+            return None
+
+        return f
+
+    def _send_array(self,values,fmt):
+        """
+        Convert a list of numerical values sharing the format fmt into a list
+        of bytes objects using a single struct call.  
+        """
+
+        base_format = self._array_formats[fmt]
+        try:
+
+            # struct packs inf, so floats need the same range check as
+            # _send_float and _send_double
+            if fmt in "fd":
+                float_min = self.board.float_min
+                float_max = self.board.float_max
+                for v in values:
+                    if v > float_max or v < float_min:
+                        raise OverflowError
+
+            packed = _repeated_struct(base_format,len(values)).pack(*values)
+        except (struct.error,OverflowError,TypeError):
+            # Let the single value method coerce the values and complain 
+            # appropriately.
+            f = self._send_methods[fmt]
+            return [f(v) for v in values]
+
+        size = struct.calcsize(base_format)
+        return [packed[i:i+size] for i in range(0,len(packed),size)]
+
     def _send_char(self,value):
         """
         Convert a single char to a bytes object.
         """
 
-        if type(value) != str and type(value) != bytes:
-            err = "char requires a string or bytes array of length 1"
-            raise ValueError(err)
+        # bytes go straight through; strings are encoded so the checks below
+        # only deal with bytes
+        char = value
+        if not isinstance(value,bytes):
 
-        if len(value) != 1:
-            err = "char must be a single character, not \"{}\"".format(value)
-            raise ValueError(err)
+            if not isinstance(value,str):
+                err = "char requires a string or bytes array of length 1"
+                raise ValueError(err)
 
-        if type(value) != bytes:
             value = value.encode("ascii")
 
+        if len(value) != 1:
+            err = "char must be a single character, not \"{}\"".format(char)
+            raise ValueError(err)
+
         if value in self._escaped_characters:
             err = "Cannot send a control character as a single char to arduino.  Send as string instead."
             raise OverflowError(err)
 
-        return struct.pack('c',value)
+        return value
 
     def _send_byte(self,value):
         """
@@ -346,20 +716,21 @@ class CmdMessenger:
 
         # Coerce to int. This will throw a ValueError if the value can't
         # actually be converted.
-        if type(value) != int:
+        if not isinstance(value,int):
             new_value = int(value)
 
             if self.give_warnings:
                 w = "Coercing {} into int ({})".format(value,new_value)
                 warnings.warn(w,Warning)
-                value = new_value
 
-        # Range check
-        if value > 255 or value < 0:
-            err = "Value {} exceeds the size of the board's byte.".format(value)
-            raise OverflowError(err)
+            value = new_value
 
-        return struct.pack("B",value)
+        # Range check is done by struct
+        try:
+            return self._byte_struct.pack(value)
+        except struct.error as e:
+            err = "Value {} exceeds the size of the board's byte.".format(value)
+            raise OverflowError(err) from e
 
     def _send_int(self,value):
         """
@@ -369,20 +740,21 @@ class CmdMessenger:
 
         # Coerce to int. This will throw a ValueError if the value can't 
         # actually be converted.
-        if type(value) != int:
+        if not isinstance(value,int):
             new_value = int(value)
 
             if self.give_warnings:
                 w = "Coercing {} into int ({})".format(value,new_value)
                 warnings.warn(w,Warning)
-                value = new_value
 
-        # Range check
-        if value > self.board.int_max or value < self.board.int_min:
+            value = new_value
+
+        # Range check is done by struct
+        try:
+            return self._int_struct.pack(value)
+        except struct.error as e:
             err = "Value {} exceeds the size of the board's int.".format(value)
-            raise OverflowError(err)
-           
-        return struct.pack(self.board.int_type,value)
+            raise OverflowError(err) from e
  
     def _send_unsigned_int(self,value):
         """
@@ -391,20 +763,21 @@ class CmdMessenger:
         """
         # Coerce to int. This will throw a ValueError if the value can't 
         # actually be converted.
-        if type(value) != int:
+        if not isinstance(value,int):
             new_value = int(value)
 
             if self.give_warnings:
                 w = "Coercing {} into int ({})".format(value,new_value)
                 warnings.warn(w,Warning)
-                value = new_value
 
-        # Range check
-        if value > self.board.unsigned_int_max or value < self.board.unsigned_int_min:
+            value = new_value
+
+        # Range check is done by struct
+        try:
+            return self._unsigned_int_struct.pack(value)
+        except struct.error as e:
             err = "Value {} exceeds the size of the board's unsigned int.".format(value)
-            raise OverflowError(err)
-           
-        return struct.pack(self.board.unsigned_int_type,value)
+            raise OverflowError(err) from e
 
     def _send_long(self,value):
         """
@@ -414,20 +787,21 @@ class CmdMessenger:
 
         # Coerce to int. This will throw a ValueError if the value can't 
         # actually be converted.
-        if type(value) != int:
+        if not isinstance(value,int):
             new_value = int(value)
             
             if self.give_warnings:
                 w = "Coercing {} into int ({})".format(value,new_value)
                 warnings.warn(w,Warning)
-                value = new_value
 
-        # Range check
-        if value > self.board.long_max or value < self.board.long_min:
+            value = new_value
+
+        # Range check is done by struct
+        try:
+            return self._long_struct.pack(value)
+        except struct.error as e:
             err = "Value {} exceeds the size of the board's long.".format(value)
-            raise OverflowError(err)
-           
-        return struct.pack(self.board.long_type,value)
+            raise OverflowError(err) from e
  
     def _send_unsigned_long(self,value):
         """
@@ -437,20 +811,21 @@ class CmdMessenger:
 
         # Coerce to int. This will throw a ValueError if the value can't 
         # actually be converted.
-        if type(value) != int:
+        if not isinstance(value,int):
             new_value = int(value)
 
             if self.give_warnings:
                 w = "Coercing {} into int ({})".format(value,new_value)
                 warnings.warn(w,Warning)
-                value = new_value
 
-        # Range check
-        if value > self.board.unsigned_long_max or value < self.board.unsigned_long_min:
+            value = new_value
+
+        # Range check is done by struct
+        try:
+            return self._unsigned_long_struct.pack(value)
+        except struct.error as e:
             err = "Value {} exceeds the size of the board's unsigned long.".format(value)
-            raise OverflowError(err)
-          
-        return struct.pack(self.board.unsigned_long_type,value)
+            raise OverflowError(err) from e
 
     def _send_float(self,value):
         """
@@ -459,7 +834,7 @@ class CmdMessenger:
 
         # convert to float. this will throw a ValueError if the type is not 
         # readily converted
-        if type(value) != float:
+        if not isinstance(value,float):
             value = float(value)
 
         # Range check
@@ -467,7 +842,7 @@ class CmdMessenger:
             err = "Value {} exceeds the size of the board's float.".format(value)
             raise OverflowError(err)
 
-        return struct.pack(self.board.float_type,value)
+        return self._float_struct.pack(value)
  
     def _send_double(self,value):
         """
@@ -476,7 +851,7 @@ class CmdMessenger:
 
         # convert to float. this will throw a ValueError if the type is not 
         # readily converted
-        if type(value) != float:
+        if not isinstance(value,float):
             value = float(value)
 
         # Range check
@@ -484,16 +859,16 @@ class CmdMessenger:
             err = "Value {} exceeds the size of the board's float.".format(value)
             raise OverflowError(err)
 
-        return struct.pack(self.board.double_type,value)
+        return self._double_struct.pack(value)
 
     def _send_string(self,value):
         """
         Convert a string to a bytes object.  If value is not a string, it is
-        be converted to one with a standard string.format call.  
+        be converted to one with str().
         """
 
-        if type(value) != bytes:
-            value = "{}".format(value).encode("ascii")
+        if not isinstance(value,bytes):
+            value = str(value).encode("ascii")
 
         return value
 
@@ -503,11 +878,13 @@ class CmdMessenger:
         """
 
         # Sanity check.
-        if type(value) != bool and value not in [0,1]:
+        if value not in (0,1):
             err = "{} is not boolean.".format(value)
             raise ValueError(err)
 
-        return struct.pack("?",value)
+        if value:
+            return b'\x01'
+        return b'\x00'
 
     def _send_guess(self,value):
         """
@@ -519,71 +896,92 @@ class CmdMessenger:
         read the values on the arduino side.
         """
 
-        if type(value) != str and type(value) != bytes and self.give_warnings:
+        if not isinstance(value,(str,bytes)) and self.give_warnings:
             w = "Warning: Sending {} as a string. This can give wildly incorrect values. Consider specifying a format and sending binary data.".format(value)
             warnings.warn(w,Warning)
 
-        if type(value) == float:
-            return "{:.10e}".format(value).encode("ascii")
-        elif type(value) == bool:
-            return "{}".format(int(value)).encode("ascii")
+        if isinstance(value,float):
+            return b"%.10e" % value
+        elif isinstance(value,bool):
+            return b"%d" % value
         else:
             return self._send_string(value)
 
+    def _recv_array(self,values,fmt):
+        """
+        Recieve a list of binary values sharing the format fmt, returning a 
+        list of python values unpacked with a single struct call.
+        """
+
+        s = _repeated_struct(self._array_formats[fmt],len(values))
+        if len(set([len(v) for v in values])) == 1:
+            joined = b''.join(values)
+            if len(joined) == s.size:
+                return list(s.unpack(joined))
+
+        # Fields are not all the right size; let the single value method
+        # complain.
+        f = self._recv_methods[fmt]
+        return [f(v) for v in values]
+
     def _recv_char(self,value):
         """
         Recieve a char in binary format, returning as string.
         """
 
-        return struct.unpack("c",value)[0].decode("ascii")
+        if len(value) != 1:
+            err = "char must be a single byte, not {}".format(value)
+            raise ValueError(err)
+
+        return value.decode("ascii")
 
     def _recv_byte(self,value):
         """
         Recieve a byte in binary format, returning as python int.
         """
 
-        return struct.unpack("B",value)[0]
+        return self._byte_struct.unpack(value)[0]
 
     def _recv_int(self,value):
         """
         Recieve an int in binary format, returning as python int.
         """
-        return struct.unpack(self.board.int_type,value)[0]
+        return self._int_struct.unpack(value)[0]
 
     def _recv_unsigned_int(self,value):
         """
         Recieve an unsigned int in binary format, returning as python int.
         """
 
-        return struct.unpack(self.board.unsigned_int_type,value)[0]
+        return self._unsigned_int_struct.unpack(value)[0]
 
     def _recv_long(self,value):
         """
         Recieve a long in binary format, returning as python int.
         """
 
-        return struct.unpack(self.board.long_type,value)[0]
+        return self._long_struct.unpack(value)[0]
 
     def _recv_unsigned_long(self,value):
         """
         Recieve an unsigned long in binary format, returning as python int.
         """
 
-        return struct.unpack(self.board.unsigned_long_type,value)[0]
+        return self._unsigned_long_struct.unpack(value)[0]
 
     def _recv_float(self,value):
         """
         Recieve a float in binary format, returning as python float.
         """
 
-        return struct.unpack(self.board.float_type,value)[0]
+        return self._float_struct.unpack(value)[0]
 
     def _recv_double(self,value):
         """
         Recieve a double in binary format, returning as python float.
         """
 
-        return struct.unpack(self.board.double_type,value)[0]
+        return self._double_struct.unpack(value)[0]
             
     def _recv_string(self,value):
         """
@@ -605,7 +1003,11 @@ class CmdMessenger:
         Receive a binary bool, return as python bool.
         """
         
-        return struct.unpack("?",value)[0]
+        if len(value) != 1:
+            err = "bool must be a single byte, not {}".format(value)
+            raise ValueError(err)
+
+        return value != b'\x00'
 
     def _recv_guess(self,value):
         """
@@ -168,6 +168,13 @@ class ArduinoBoard:
 
         return self.comm.read()
 
+    def read_until(self,terminator):
+        """
+        Wrap serial read_until method.
+        """
+
+        return self.comm.read_until(terminator)
+
     def readline(self):
         """
         Wrap serial readline method.